@@ -0,0 +1,390 @@
+import asyncio
+import logging
+import random
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from dateutil.parser import parse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+API_BASE = 'https://www.googleapis.com/youtube/v3'
+USER_AGENT = 'youtubravo-crawler/1.0'
+
+
+class QuotaExhaustedError(Exception):
+    """raised when every developer key has exceeded its daily quota"""
+
+
+class AsyncYoutubeCrawler(object):
+    """
+    Youtube data crawler based on Youtube Data Api v3 REST endpoints
+
+    One asyncio event loop multiplexes every in-flight request, so no
+    Pool/ThreadPool is needed to hide HTTP latency. Public methods mirror
+    YoutubeCrawler and stay blocking by wrapping coroutines with asyncio.run.
+    """
+
+    _MAX_RETRIES = 5
+
+    def __init__(self, api_key_list, processes=10):
+        """
+        Args:
+            api_key_list (list): developer key list
+            processes(int): the number of concurrent requests in flight
+        """
+        self.api_key_list = list(api_key_list)
+        self.key_index = 0
+        self.processes = processes
+        self._key_failures = 0
+        self._key_generation = 0
+        self._gzip_checked = False
+
+    def _rotate_key(self, generation):
+        """Swap to the next developer key in the querystring. Raises
+        QuotaExhaustedError once every key has failed in a row without an
+        intervening successful call.
+        Args:
+            generation(int): the generation the failing request was sent with;
+                             when another failure already rotated past it,
+                             rotation is skipped so gathered failures of one
+                             key rotate (and count) only once
+        """
+        if generation != self._key_generation:
+            return
+
+        self._key_failures += 1
+
+        if self._key_failures > len(self.api_key_list):
+            raise QuotaExhaustedError('every developer key has exceeded its daily quota')
+
+        self.key_index = (self.key_index + 1) % len(self.api_key_list)
+        self._key_generation += 1
+
+    @staticmethod
+    def _session():
+        """client session requesting gzip explicitly; youtube json responses
+        compress ~10x so the negotiation matters for large playlist pages"""
+        return aiohttp.ClientSession(headers={'Accept-Encoding': 'gzip, deflate',
+                                              'User-Agent': USER_AGENT})
+
+    @staticmethod
+    def _remove_empty_kwargs(**kwargs):
+
+        good_kwargs = {}
+
+        if kwargs is not None:
+
+            for key, value in kwargs.items():
+                if value:
+                    good_kwargs[key] = value
+
+        return good_kwargs
+
+    @staticmethod
+    def _chunks(seq, n):
+        """
+        Args:
+            seq(list): original list to be split
+            n(int): split size
+        Yields:
+            list: successive n-sized slices of seq
+        """
+        for i in range(0, len(seq), n):
+            yield seq[i:i + n]
+
+    async def _aget(self, session, semaphore, path, **params):
+        """
+        Args:
+            session(aiohttp.ClientSession): shared http session
+            semaphore(asyncio.Semaphore): concurrency bound
+            path(str): youtube rest resource path e.g. 'channels'
+            **params: Arbitrary querystring arguments.
+        Returns:
+            dict: response in dictionary form
+        """
+        params = self._remove_empty_kwargs(**params)
+
+        resp = None
+
+        for attempt in range(self._MAX_RETRIES):
+
+            generation = self._key_generation
+            params['key'] = self.api_key_list[self.key_index]
+
+            async with semaphore:
+
+                async with session.get('%s/%s' % (API_BASE, path), params=params) as resp:
+
+                    if resp.status == 200:
+
+                        self._key_failures = 0
+
+                        # verify once per crawler that gzip was negotiated
+                        if not self._gzip_checked:
+
+                            self._gzip_checked = True
+
+                            encoding = resp.headers.get('Content-Encoding', '')
+
+                            if encoding.lower() not in ('gzip', 'deflate', 'br'):
+                                logger.warning("response not compressed: "
+                                               "Content-Encoding=%r" % encoding)
+
+                        return await resp.json()
+
+                    content = await resp.read()
+
+            # decide outside the context managers so backoff sleeps don't
+            # hold a semaphore slot or the connection
+            logger.error("%s %s" % (resp.status, content))
+
+            # parameter cannot found. mainly for removed videos' ids
+            if resp.status == 404:
+
+                return
+
+            if resp.status == 403:
+
+                # comment disabled
+                if b'disabled comments' in content:
+
+                    return
+
+                # transient rate limit, back off and retry on the same key
+                if b'rateLimitExceeded' in content:
+
+                    await asyncio.sleep(min(60, 2 ** attempt + random.random()))
+                    continue
+
+                # exceeded quota for day, swap the key in the querystring
+                if b'quota' in content:
+
+                    self._rotate_key(generation)
+                    continue
+
+                resp.raise_for_status()
+
+            # server-side errors are worth retrying with backoff
+            if resp.status >= 500:
+
+                await asyncio.sleep(min(60, 2 ** attempt + random.random()))
+                continue
+
+            resp.raise_for_status()
+
+        # retries exhausted
+        resp.raise_for_status()
+
+    async def _video_desc(self, session, semaphore, ch_id, upload_id, update, days):
+        """video description list given by an upload id
+        Args:
+            session(aiohttp.ClientSession): shared http session
+            semaphore(asyncio.Semaphore): concurrency bound
+            ch_id(str): channel_id
+            upload_id(str): upload_id
+            update(bool): True if requesting video data created after N days ago
+            days(int): N days
+        Returns:
+            dict: same shape as YoutubeCrawler._video_desc
+        """
+        next_page_token = ''
+        video_dict_list = deque()
+
+        while True:
+
+            response = await self._aget(session, semaphore, 'playlistItems',
+                                        playlistId=upload_id,
+                                        part='snippet',
+                                        maxResults=50,
+                                        pageToken=next_page_token)
+
+            if response is None:
+                return {
+                    'ch_id': ch_id,
+                    'upload_id': upload_id,
+                    'video_info_list': video_dict_list
+                }
+
+            video_dict = [{'channelId': item['snippet']['channelId'],
+                           'videoId': item['snippet']['resourceId']['videoId'],
+                           'title': item['snippet']['title'],
+                           'description': item['snippet']['description'],
+                           'publishedAt': item['snippet']['publishedAt'],
+                           'thumbnails': item['snippet']['thumbnails']
+                           }
+                          for item in response['items']]
+
+            video_dict_list.extend(video_dict)
+
+            # update를 위한 경우
+            if update is True:
+
+                try:
+
+                    vid_pub_at = video_dict[-1]['publishedAt']
+
+                    vid_pub_at_dt = parse(vid_pub_at)
+
+                    utc_now = datetime.now(timezone.utc)
+                    stdd = utc_now - timedelta(days=days + 1)
+
+                    if vid_pub_at_dt < stdd:
+                        return {
+                            'ch_id': ch_id,
+                            'upload_id': upload_id,
+                            'video_info_list': video_dict_list
+                        }
+                except IndexError:
+                    return {
+                        'ch_id': ch_id,
+                        'upload_id': upload_id,
+                        'video_info_list': video_dict_list
+                    }
+
+            if 'nextPageToken' in response.keys():
+                next_page_token = response['nextPageToken']
+
+            else:
+
+                return {
+                    'ch_id': ch_id,
+                    'upload_id': upload_id,
+                    'video_info_list': video_dict_list
+                }
+
+    async def _channel_items(self, session, semaphore, id, part):
+        """merged channels().list items for a comma joined id string"""
+        id_list = id.split(',')
+
+        tasks = [self._aget(session, semaphore, 'channels',
+                            part=part, id=','.join(chunk), maxResults=50)
+                 for chunk in self._chunks(id_list, 50)]
+
+        responses = await asyncio.gather(*tasks)
+
+        items = deque()
+
+        for response in responses:
+            if response:
+                items.extend(response.get('items', []))
+
+        return items
+
+    async def _channel_desc(self, id):
+
+        semaphore = asyncio.Semaphore(self.processes)
+
+        async with self._session() as session:
+            items = await self._channel_items(session, semaphore, id, 'snippet')
+
+        desc_date_list = [{'title': response['snippet']['title'],
+                           'ch_id': response['id'],
+                           'description': response['snippet']['description'],
+                           'publishedAt': response['snippet']['publishedAt'][:10],
+                           'thumbnails': response['snippet']['thumbnails']}
+
+                          for response in items]
+
+        return desc_date_list
+
+    def channel_desc(self, id=None):
+        """Channel description method, same shape as YoutubeCrawler.channel_desc
+        Args:
+            id(str): channel_id
+        Returns:
+            list: dictionary array
+        """
+        return asyncio.run(self._channel_desc(id))
+
+    async def _channel_video_desc(self, id, update, days):
+
+        semaphore = asyncio.Semaphore(self.processes)
+
+        async with self._session() as session:
+
+            items = await self._channel_items(session, semaphore, id, 'contentDetails')
+
+            ch_uploads_id = [{'ch_id': item['id'],
+                              'uploads_id': item['contentDetails']['relatedPlaylists']['uploads']}
+                             for item in items]
+
+            tasks = [self._video_desc(session, semaphore,
+                                      ch_uploads['ch_id'], ch_uploads['uploads_id'],
+                                      update, days)
+                     for ch_uploads in ch_uploads_id]
+
+            outputs = await asyncio.gather(*tasks)
+
+        return outputs
+
+    def channel_video_desc(self, id=None, update=False, days=0):
+        """video description list given by channel ids
+        channel ids => upload ids => asyncio.gather => video description list
+        Args:
+             id(str): channel_id
+             update(bool): True if requesting video data created after N days ago
+             days(int): N days
+        Returns:
+            list: dictionary array, same shape as YoutubeCrawler.channel_video_desc
+        """
+        return asyncio.run(self._channel_video_desc(id, update, days))
+
+    async def _video_stats(self, session, semaphore, vid):
+
+        response = await self._aget(session, semaphore, 'videos',
+                                    id=vid, part='statistics', maxResults=50)
+
+        vid_stats_dict_list = deque()
+
+        if response is None:
+            return vid_stats_dict_list
+
+        key_require = set(['viewCount', 'likeCount', 'dislikeCount', 'favoriteCount', 'commentCount'])
+
+        for item in response['items']:
+
+            vid_stats_dict = item['statistics']
+
+            key_has = set(item['statistics'].keys())
+            empty_keys = key_require - key_has
+
+            # if there is any empty key
+            if empty_keys:
+                for key in empty_keys:
+                    vid_stats_dict[key] = None
+
+            vid_stats_dict['vid_id'] = item['id']
+            vid_stats_dict_list.append(vid_stats_dict)
+
+        return vid_stats_dict_list
+
+    async def _video_stats_gather(self, vids):
+
+        vid_list = vids.split(',')
+
+        semaphore = asyncio.Semaphore(self.processes)
+
+        async with self._session() as session:
+
+            tasks = [self._video_stats(session, semaphore, ','.join(chunk))
+                     for chunk in self._chunks(vid_list, 50)]
+
+            results = await asyncio.gather(*tasks)
+
+        outputs = deque()
+
+        for result in results:
+            outputs.extend(result)
+
+        return outputs
+
+    def video_stats(self, vids):
+        """Video Statistics by video id(s)
+        Args:
+             vids(str): Youtube video id(s), no length limit
+        Returns:
+            deque: dictionary array, same shape as YoutubeCrawler.video_stats
+        """
+        return asyncio.run(self._video_stats_gather(vids))
@@ -1,30 +1,239 @@
+import hashlib
+import json
 import logging
-from collections import deque
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, groupby
+from operator import itemgetter
 from datetime import datetime, timedelta, timezone
 from dateutil.parser import parse
 from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
+import httplib2
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import set_user_agent
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'youtubravo-crawler/1.0'
+
+
+class QuotaExhaustedError(Exception):
+    """raised when every developer key has exceeded its daily quota"""
+
+
+class _TokenBucket(object):
+    """Token bucket rate limiter; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate(float): tokens refilled per second
+            capacity(float): maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+
+        while True:
+
+            with self.lock:
+
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.timestamp) * self.rate)
+                self.timestamp = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def __getstate__(self):
+        # locks cannot cross process boundaries
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.timestamp = time.monotonic()
+
 
 class YoutubeCrawler(object):
     """
     Youtube data crawler based on Youtube Data Api v3
     """
 
-    def __init__(self, api_key_list, processes=10):
+    # resource name => client attribute, resolved once instead of an if chain
+    _RESOURCES = {
+        'channels': 'channels',
+        'search': 'search',
+        'videos': 'videos',
+        'playlistitems': 'playlistItems',
+        'videocategories': 'videoCategories',
+        'commentThreads': 'commentThreads',
+        'comments': 'comments',
+    }
+
+    _MAX_RETRIES = 5
+
+    # cache TTL in seconds per (resource, part); None keeps the entry for
+    # the process lifetime. Uncached (resource, part) pairs always hit the api
+    _CACHE_TTL = {
+        ('channels', 'snippet'): 24 * 3600,
+        ('channels', 'statistics'): 3600,
+        ('videos', 'statistics'): 5 * 60,
+        # the channel => uploads playlist mapping is permanent
+        ('channels', 'contentDetails'): None,
+        # short TTL only: an uploads playlist's first page changes on every
+        # upload, so repeated crawls in one process must see new videos
+        ('playlistitems', 'snippet'): 5 * 60,
+    }
+
+    _CACHE_MAX_ENTRIES = 1024
+
+    def __init__(self, api_key_list, processes=10, thread=True, quota_per_day=None):
         """
         Args:
             api_key_list (list): developer key list
-            processes(int): the number of processes
-            thread(bool): Thread use True instead of Process, default False
+            processes(int): the number of pool workers
+            thread(bool): Thread use True instead of Process, default True
+                          since the work is I/O-bound
+            quota_per_day(int): per-key daily unit quota to throttle against,
+                                None (default) disables throttling
         """
-        self.api_key_iter = iter(api_key_list)
-        self.client = build("youtube", "v3", developerKey=next(self.api_key_iter))
+        api_key_list = list(api_key_list)
+
+        self._key_cycle = cycle(api_key_list)
+        self._key_lock = threading.Lock()
+        self._n_keys = len(api_key_list)
+        self._key_failures = 0
+        self._api_key = next(self._key_cycle)
+        self._key_version = 0
+        self._local = threading.local()
         self.processes = processes
+        self.thread = thread
+        self._pool = None
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        if quota_per_day:
+            rate = quota_per_day * len(api_key_list) / 86400
+            self._bucket = _TokenBucket(rate=rate, capacity=processes)
+
+        else:
+            self._bucket = None
+
+    @property
+    def client(self):
+        """Per-thread youtube client
+
+        httplib2 is not thread-safe and keeps its keep-alive connection pool
+        on the Http object, so each worker thread builds its own client once
+        and reuses the kept-alive connections for every subsequent call
+        instead of paying a TCP+TLS handshake per execute().
+        """
+        if getattr(self._local, 'key_version', None) != self._key_version:
+
+            # identify the client explicitly; googleapiclient negotiates gzip
+            # on every request it sends through this transport
+            http = set_user_agent(httplib2.Http(), USER_AGENT)
+
+            self._local.client = build("youtube", "v3", http=http,
+                                       developerKey=self._api_key)
+            self._local.key_version = self._key_version
+
+        return self._local.client
+
+    def _renew_client(self, key_version=None):
+        """Rotate round-robin to the next developer key and invalidate
+        per-thread clients. Raises QuotaExhaustedError once every key has
+        failed in a row without an intervening successful call.
+        Args:
+            key_version(int): the version the failing request was built with;
+                              when another failure already rotated past it,
+                              rotation is skipped so concurrent failures of
+                              one key rotate (and count) only once
+        """
+        with self._key_lock:
+
+            if key_version is not None and key_version != self._key_version:
+                return
+
+            self._key_failures += 1
+
+            if self._key_failures > self._n_keys:
+                raise QuotaExhaustedError('every developer key has exceeded its daily quota')
+
+            self._api_key = next(self._key_cycle)
+            self._key_version += 1
+
+    @staticmethod
+    def _error_reason(e):
+        """error reason string from an HttpError, '' if unparsable"""
+        try:
+            return json.loads(e.content)['error']['errors'][0]['reason']
+
+        except (ValueError, KeyError, IndexError):
+            return ''
+
+    def __getstate__(self):
+        # thread-local clients, pools and locks cannot cross process
+        # boundaries; workers recreate them on first use
+        state = self.__dict__.copy()
+        del state['_local']
+        del state['_key_lock']
+        del state['_cache_lock']
+        state['_pool'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._key_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+    def _get_pool(self):
+        """Lazily created pool, shared across method calls so repeated crawls
+        don't pay worker startup each time. ThreadPool suits this I/O-bound
+        crawling when thread=True"""
+        if self._pool is None:
+
+            if self.thread:
+                self._pool = ThreadPool(self.processes)
+
+            else:
+                self._pool = Pool(self.processes)
+
+        return self._pool
+
+    def close(self):
+        """terminate the shared pool; a new one is created lazily on next use"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @staticmethod
     def _remove_empty_kwargs(**kwargs):
@@ -39,102 +248,301 @@ class YoutubeCrawler(object):
 
         return good_kwargs
 
-    def _response(self, resource, **kwargs):
+    @staticmethod
+    def _cache_key(resource, kwargs):
+        raw = repr((resource, sorted(kwargs.items())))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _from_cache(self, resource, kwargs, force_refresh=False):
+        """cache-aside lookup; returns the cached response or None on miss"""
+        if force_refresh or (resource, kwargs.get('part')) not in self._CACHE_TTL:
+            return None
+
+        key = self._cache_key(resource, kwargs)
+
+        with self._cache_lock:
+
+            entry = self._cache.get(key)
+
+            if entry is not None:
+
+                expires, response = entry
+
+                if expires is None or expires > time.time():
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                    return response
+
+                del self._cache[key]
+
+            self.cache_misses += 1
+
+        return None
+
+    def _to_cache(self, resource, kwargs, response):
+        ttl = self._CACHE_TTL.get((resource, kwargs.get('part')), False)
+
+        if ttl is False or response is None:
+            return
+
+        expires = time.time() + ttl if ttl is not None else None
+
+        with self._cache_lock:
+
+            key = self._cache_key(resource, kwargs)
+
+            self._cache[key] = (expires, response)
+            self._cache.move_to_end(key)
+
+            # LRU size bound: evict the least recently used entries
+            while len(self._cache) > self._CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def _list_request(self, resource, **kwargs):
         """
         Args:
             resource(str): youtube client method resource
             **kwargs: Arbitrary keyword arguments.
+        Returns:
+            googleapiclient.http.HttpRequest: unexecuted list request
+        """
+        try:
+            method = self._RESOURCES[resource]
+
+        except KeyError:
+            raise ValueError('unknown resource: %s' % resource)
+
+        return getattr(self.client, method)().list(**kwargs)
+
+    def _response(self, resource, force_refresh=False, **kwargs):
+        """
+        Args:
+            resource(str): youtube client method resource
+            force_refresh(bool): True to bypass the response cache
+            **kwargs: Arbitrary keyword arguments.
         Returns:
             dict: response in dictionary form
         """
         kwargs = self._remove_empty_kwargs(**kwargs)
 
+        cached = self._from_cache(resource, kwargs, force_refresh)
+
+        if cached is not None:
+            return cached
+
         response = None
+        last_error = None
 
-        while not response:
+        for attempt in range(self._MAX_RETRIES):
 
             try:
 
-                if resource == 'channels':
-                    response = self.client.channels().list(
-                        **kwargs
-                    ).execute()
-
-                if resource == 'search':
-                    response = self.client.search().list(
-                        **kwargs
-                    ).execute()
-
-                if resource == 'videos':
-                    response = self.client.videos().list(
-                        **kwargs
-                    ).execute()
-
-                if resource == 'playlistitems':
-                    response = self.client.playlistItems().list(
-                        **kwargs
-                    ).execute()
-
-                if resource == 'videocategories':
-                    response = self.client.videoCategories().list(
-                        **kwargs
-                    ).execute()
-                    
-                if resource == 'commentThreads':
-                    response = self.client.commentThreads().list(
-                        **kwargs
-                    ).execute()
-                    
-                if resource == 'comments':
-                    response = self.client.comments().list(
-                        **kwargs
-                    ).execute()
-                    
+                if self._bucket:
+                    self._bucket.acquire()
+
+                key_version = self._key_version
+
+                response = self._list_request(resource, **kwargs).execute()
+
+                self._key_failures = 0
+
+                break
+
             except HttpError as e:
-                
+
                 logger.error("%s" % e)
-                
+
+                last_error = e
+
                 # parameter cannot found. mainly for removed videos' ids
                 if e.resp.status == 404:
-                    
+
                     return
-                    
+
                 if e.resp.status == 403:
-                    
+
                     # comment disabled
                     if b'disabled comments' in e.content:
-                        
+
                         return
-                    
-                    # exceeded quota for day
-                    elif b'quota' in e.content:
-                       
-                        self.client = build("youtube", "v3", developerKey=next(self.api_key_iter))
-                
-                pass
+
+                    reason = self._error_reason(e)
+
+                    # transient rate limit, back off and retry on the same key
+                    if reason in ('rateLimitExceeded', 'userRateLimitExceeded'):
+
+                        time.sleep(min(60, 2 ** attempt + random.random()))
+                        continue
+
+                    # exceeded quota for day, retry immediately on the next key
+                    if reason in ('quotaExceeded', 'dailyLimitExceeded') or b'quota' in e.content:
+
+                        self._renew_client(key_version)
+                        continue
+
+                    raise
+
+                # server-side errors are worth retrying with backoff
+                if e.resp.status >= 500:
+
+                    time.sleep(min(60, 2 ** attempt + random.random()))
+                    continue
+
+                raise
+
+        else:
+            raise last_error
+
+        self._to_cache(resource, kwargs, response)
 
         return response
 
+    def _batch_response(self, resource, id, force_refresh=False, **kwargs):
+        """Multiplex chunked id calls into one BatchHttpRequest round-trip
+        Args:
+            resource(str): youtube client method resource
+            id(str): comma joined ids, no 50-id limit
+            force_refresh(bool): True to bypass the response cache
+            **kwargs: Arbitrary keyword arguments.
+        Returns:
+            list: merged items from every sub-request response
+        """
+        kwargs = self._remove_empty_kwargs(**kwargs)
+
+        cached = self._from_cache(resource, dict(kwargs, id=id), force_refresh)
+
+        if cached is not None:
+            return cached
+
+        id_list = id.split(',')
+
+        responses = {}
+        failed = {}
+
+        def callback(request_id, response, exception):
+
+            if exception is not None:
+                failed[request_id] = exception
+
+            else:
+                responses[request_id] = response
+
+        pending = {str(i): ','.join(chunk)
+                   for i, chunk in enumerate(self._chunks(id_list, 50))}
+
+        for attempt in range(self._MAX_RETRIES):
+
+            if not pending:
+                break
+
+            batch = self.client.new_batch_http_request(callback=callback)
+
+            failed.clear()
+
+            for request_id, id_chunk in pending.items():
+                batch.add(self._list_request(resource, id=id_chunk, **kwargs),
+                          request_id=request_id)
+
+            n_before = len(responses)
+
+            key_version = self._key_version
+
+            batch.execute()
+
+            # only a success from *this* pass proves the current key works;
+            # responses accumulates across passes and must not reset the counter
+            if len(responses) > n_before:
+                self._key_failures = 0
+
+            retry = {}
+            backoff = False
+            quota = False
+
+            # mirror _response: rotate on quota, back off on rate limits and
+            # 5xx, re-raise everything else so no sub-request is dropped
+            for request_id, e in failed.items():
+
+                logger.error("%s" % e)
+
+                if not isinstance(e, HttpError):
+                    raise e
+
+                if e.resp.status == 403:
+
+                    reason = self._error_reason(e)
+
+                    if reason in ('rateLimitExceeded', 'userRateLimitExceeded'):
+                        backoff = True
+                        retry[request_id] = pending[request_id]
+                        continue
+
+                    if reason in ('quotaExceeded', 'dailyLimitExceeded') or b'quota' in e.content:
+                        quota = True
+                        retry[request_id] = pending[request_id]
+                        continue
+
+                    raise e
+
+                if e.resp.status >= 500:
+                    backoff = True
+                    retry[request_id] = pending[request_id]
+                    continue
+
+                raise e
+
+            # every sub-request in the batch went out on the same key, so
+            # rotate once per pass no matter how many chunks hit the quota
+            if quota:
+                self._renew_client(key_version)
+
+            pending = retry
+
+            if pending and backoff:
+                time.sleep(min(60, 2 ** attempt + random.random()))
+
+        else:
+
+            if pending:
+                # retries exhausted with sub-requests still failing; do not
+                # return (or cache) a partial item list
+                raise next(iter(failed.values()))
+
+        items = deque()
+
+        for request_id in sorted(responses, key=int):
+            items.extend(responses[request_id].get('items', []))
+
+        self._to_cache(resource, dict(kwargs, id=id), items)
+
+        return items
+
     @staticmethod
-    def _split_list(l, n):
+    def _chunks(seq, n):
         """
         Args:
-            l(list): original list to be split
+            seq(list): original list to be split
             n(int): split size
-        Returns:
-            list: n-sized list from list l
+        Yields:
+            list: successive n-sized slices of seq
         """
-        split_list = []
+        for i in range(0, len(seq), n):
+            yield seq[i:i + n]
 
-        for i in range(0, len(l), n):
-            split_list.append(l[i:i + n])
+    @staticmethod
+    def _uploads_id(ch_id):
+        """Uploads playlist id derived locally, skipping the contentDetails
+        call: for standard channels it is 'UU' + channel_id without the 'UC'
+        prefix. Returns None for non-standard ids, which need the api."""
+        if ch_id.startswith('UC'):
+            return 'UU' + ch_id[2:]
 
-        return split_list
+        return None
 
-    def channel_desc(self, id=None):
+    def channel_desc(self, id=None, force_refresh=False):
         """Channel description method
         Args:
             id(str): channel_id
+            force_refresh(bool): True to bypass the response cache
         Returns:
             list: dictionary array
         Examples:
@@ -144,22 +552,30 @@ class YoutubeCrawler(object):
             'description': channel_description,
              'publisehdAt': channel_created_date}, ...]
         """
-        responses = self._response('channels', part='snippet', id=id)
+        items = self._batch_response('channels', id, force_refresh=force_refresh,
+                                     part='snippet')
 
-        desc_date_list = [{'title': response['snippet']['title'],
-                           'ch_id': response['id'],
-                           'description': response['snippet']['description'],
-                           'publishedAt': response['snippet']['publishedAt'][:10],
-                           'thumbnails': response['snippet']['thumbnails']}
+        snip_get = itemgetter('title', 'description', 'publishedAt', 'thumbnails')
 
-                          for response in responses['items']]
+        desc_date_list = []
+
+        for response in items:
+
+            title, description, published_at, thumbnails = snip_get(response['snippet'])
+
+            desc_date_list.append({'title': title,
+                                   'ch_id': response['id'],
+                                   'description': description,
+                                   'publishedAt': published_at[:10],
+                                   'thumbnails': thumbnails})
 
         return desc_date_list
 
-    def channel_countstats(self, id=None):
+    def channel_countstats(self, id=None, force_refresh=False):
         """Channel count statistics method
         Args:
             id(str): channel_id
+            force_refresh(bool): True to bypass the response cache
         Returns:
             list: dictionary array
         Examples:
@@ -170,11 +586,12 @@ class YoutubeCrawler(object):
             'videoCount': int,
             'sub_view_ratio': float;None}, ...]
         """
-        responses = self._response('channels', part='statistics', id=id)
+        items = self._batch_response('channels', id, force_refresh=force_refresh,
+                                     part='statistics')
 
         result_list = deque()
 
-        for response in responses['items']:
+        for response in items:
 
             ch_id = response['id']
 
@@ -186,17 +603,13 @@ class YoutubeCrawler(object):
 
             if statistics_response['hiddenSubscriberCount'] is True:
 
-                subscriber_count = None
-                sub_view_ratio = None
+                subscriber_count = sub_view_ratio = None
 
             else:
 
                 subscriber_count = int(statistics_response['subscriberCount'])
 
-                try:
-                    sub_view_ratio = view_count / subscriber_count
-                except ZeroDivisionError:
-                    sub_view_ratio = None
+                sub_view_ratio = view_count / subscriber_count if subscriber_count else None
 
             result_list.append({'ch_id': ch_id, 'subscriberCount': subscriber_count,
                                 'viewCount': view_count, 'videoCount': video_count,
@@ -204,94 +617,175 @@ class YoutubeCrawler(object):
 
         return result_list
 
-    def _video_desc(self, ch_id, upload_id, update, days):
+    def _video_desc(self, ch_id, upload_id, update, days, ids_only=False,
+                    force_refresh=False):
         """video description list given by an upload id
         Args:
             ch_id(str): channel_id
             upload_id(str): upload_id
             update(bool): True if requesting video data created after N days ago
             days(int): N days
+            ids_only(bool): True to request only video ids (and publishedAt for
+                            the update cutoff) via the partial-response fields
+                            parameter; the other columns stay empty
+            force_refresh(bool): True to bypass the response cache
         Returns:
             dict
         Examples:
             >>> _video_desc(ch_id, upload_id)
             {'ch_id': channel_id,
              'upload_id': upload_id,
-             'video_info_list': [{'channelId': channel_id,
-                                  'videoId': video_id,
-                                  'title': video title,
-                                  'description': video description,
-                                  'publishedAt': video published time,
-                                  'thumbnails': video thumbnail_urls}, ...]}
+             'channel_ids': [channel_id, ...],
+             'video_ids': [video_id, ...],
+             'titles': [video title, ...],
+             'descriptions': [video description, ...],
+             'published_at': [video published time, ...],
+             'thumbnails': [video thumbnail_urls, ...]}
         """
-        next_page_token = ''
-        video_dict_list = deque()
+        # column (SoA) layout: one list per field instead of one dict per
+        # video, so id-only consumers read video_ids without row overhead
+        channel_ids = deque()
+        video_ids = deque()
+        titles = deque()
+        descriptions = deque()
+        published_at = deque()
+        thumbnails = deque()
+
+        def soa():
+            return {
+                'ch_id': ch_id,
+                'upload_id': upload_id,
+                'channel_ids': channel_ids,
+                'video_ids': video_ids,
+                'titles': titles,
+                'descriptions': descriptions,
+                'published_at': published_at,
+                'thumbnails': thumbnails
+            }
+
+        # multi-key fetch bound once; pushes the per-item lookups into C
+        snip_get = itemgetter('channelId', 'resourceId', 'title',
+                              'description', 'publishedAt', 'thumbnails')
+
+        # server-side projection: strip the payload down to what is used
+        if ids_only:
+            fields = 'items(snippet(resourceId/videoId,publishedAt)),nextPageToken'
 
-        while True:
+        else:
+            fields = None
+
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        try:
+
+            future = executor.submit(self._response, 'playlistitems',
+                                     playlistId=upload_id,
+                                     part='snippet',
+                                     maxResults=50,
+                                     pageToken='',
+                                     fields=fields,
+                                     force_refresh=force_refresh)
 
-            response = self._response('playlistitems', playlistId=upload_id,
-                                      part='snippet',
-                                      maxResults=50,
-                                      pageToken=next_page_token)
+            while True:
+
+                response = future.result()
 
-            video_dict = [{'channelId': item['snippet']['channelId'],
-                           'videoId': item['snippet']['resourceId']['videoId'],
-                           'title': item['snippet']['title'],
-                           'description': item['snippet']['description'],
-                           'publishedAt': item['snippet']['publishedAt'],
-                           'thumbnails': item['snippet']['thumbnails']
-                           }
-                          for item in response['items']]
+                if response is None:
+                    return soa()
 
-            video_dict_list.extend(video_dict)
+                # prefetch the next page while this one is being processed
+                next_page_token = response.get('nextPageToken')
 
-            # update를 위한 경우
-            if update is True:
+                if next_page_token:
+                    future = executor.submit(self._response, 'playlistitems',
+                                             playlistId=upload_id,
+                                             part='snippet',
+                                             maxResults=50,
+                                             pageToken=next_page_token,
+                                             fields=fields,
+                                             force_refresh=force_refresh)
 
-                try:
+                if ids_only:
 
-                    vid_pub_at = video_dict[-1]['publishedAt']
+                    for item in response['items']:
 
-                    vid_pub_at_dt = parse(vid_pub_at)
+                        snip = item['snippet']
+
+                        video_ids.append(snip['resourceId']['videoId'])
+                        published_at.append(snip['publishedAt'])
+
+                else:
+
+                    for item in response['items']:
+
+                        ch, rid, title, description, pub_at, thumb = snip_get(item['snippet'])
+
+                        channel_ids.append(ch)
+                        video_ids.append(rid['videoId'])
+                        titles.append(title)
+                        descriptions.append(description)
+                        published_at.append(pub_at)
+                        thumbnails.append(thumb)
+
+                # update를 위한 경우
+                if update is True:
+
+                    if not response['items']:
+                        return soa()
+
+                    vid_pub_at_dt = parse(published_at[-1])
 
                     utc_now = datetime.now(timezone.utc)
                     stdd = utc_now - timedelta(days=days + 1)
 
                     if vid_pub_at_dt < stdd:
-                        return {
-                            'ch_id': ch_id,
-                            'upload_id': upload_id,
-                            'video_info_list': video_dict_list
-                        }
-                except IndexError:
-                    return {
-                        'ch_id': ch_id,
-                        'upload_id': upload_id,
-                        'video_info_list': video_dict_list
-                    }
-
-            if 'nextPageToken' in response.keys():
-                next_page_token = response['nextPageToken']
+                        return soa()
 
-            else:
+                if not next_page_token:
 
-                return {
-                    'ch_id': ch_id,
-                    'upload_id': upload_id,
-                    'video_info_list': video_dict_list
-                }
+                    return soa()
 
-    def channel_video_desc(self, id=None, update=False, days=0):
+        finally:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _video_rows(desc):
+        """AoS adapter over a columnar _video_desc result
+        Args:
+            desc(dict): _video_desc return value
+        Yields:
+            dict: per-video dictionary in the historical video_info_list shape
+        """
+        for ch, vid, title, description, pub_at, thumb in zip(
+                desc['channel_ids'], desc['video_ids'], desc['titles'],
+                desc['descriptions'], desc['published_at'], desc['thumbnails']):
+
+            yield {'channelId': ch,
+                   'videoId': vid,
+                   'title': title,
+                   'description': description,
+                   'publishedAt': pub_at,
+                   'thumbnails': thumb}
+
+    def channel_video_desc(self, id=None, update=False, days=0, columnar=False,
+                           ids_only=False, force_refresh=False):
         """video description list given by channel ids
         channel ids => upload ids => MultiThreading => video description list by upload ids
         Args:
              id(str): channel_id
              update(bool): True if requesting video data created after N days ago
              days(int): N days
-        Returns:
-            list: dictionary array
+             columnar(bool): True to return the raw column-oriented _video_desc
+                             dictionaries instead of per-video row dicts
+             ids_only(bool): True to fetch only video ids, cutting response
+                             payload; implies columnar output
+             force_refresh(bool): True to bypass the response cache
+        Yields:
+            dict: per-channel dictionary as each worker finishes, so memory
+                  stays bounded by one channel; wrap with list() for the old
+                  materialized behavior. Order follows completion, not input
         Examples:
-            >>>channel_video_desc(id=channel_id)
+            >>>list(channel_video_desc(id=channel_id))
             [{'ch_id': channel_id,
               'upload_id': upload_id,
               'video_info_list': [{'channelId': channel_id,
@@ -303,31 +797,48 @@ class YoutubeCrawler(object):
                                    }, ...]}, ...]
         """
 
-        responses = self._response('channels', part='contentDetails', id=id)
+        ch_uploads_id = []
+        unknown = []
 
-        ch_uploads_id = [{'ch_id': item['id'],
-                          'uploads_id': item['contentDetails']['relatedPlaylists']['uploads']}
-                         for item in responses['items']]
-        results = deque()
+        for ch_id in id.split(','):
 
-        pool = Pool(self.processes)
+            uploads_id = self._uploads_id(ch_id)
 
-        for ch_uploads in ch_uploads_id:
-            upload_id = ch_uploads['uploads_id']
-            ch_id = ch_uploads['ch_id']
+            if uploads_id:
+                ch_uploads_id.append({'ch_id': ch_id, 'uploads_id': uploads_id})
 
-            ready = pool.apply_async(self._video_desc,
-                                     kwds={
-                                         'ch_id': ch_id,
-                                         'upload_id': upload_id,
-                                         'update': update,
-                                         'days': days
-                                     })
-            results.append(ready)
+            else:
+                unknown.append(ch_id)
 
-        outputs = [p.get() for p in results]
+        # fall back to the api only for ids the local rule can't derive
+        if unknown:
 
-        return outputs
+            items = self._batch_response('channels', ','.join(unknown),
+                                         force_refresh=force_refresh,
+                                         part='contentDetails')
+
+            ch_uploads_id.extend(
+                {'ch_id': item['id'],
+                 'uploads_id': item['contentDetails']['relatedPlaylists']['uploads']}
+                for item in items)
+
+        args = [(ch_uploads['ch_id'], ch_uploads['uploads_id'], update, days,
+                 ids_only, force_refresh)
+                for ch_uploads in ch_uploads_id]
+
+        for output in self._get_pool().imap_unordered(self._video_desc_args, args):
+
+            if columnar or ids_only:
+                yield output
+
+            else:
+                yield {'ch_id': output['ch_id'],
+                       'upload_id': output['upload_id'],
+                       'video_info_list': list(self._video_rows(output))}
+
+    def _video_desc_args(self, args):
+        """single-argument _video_desc adapter for Pool.imap_unordered"""
+        return self._video_desc(*args)
 
     def _video_trend(self, rc, cid=0):
         """trending video list given by region code and category id
@@ -415,8 +926,6 @@ class YoutubeCrawler(object):
 
         cat_id_list['0'] = 'ALL'
 
-        pool = Pool(self.processes)
-
         if top is True:
 
             most_popular_video_list = self._video_trend(rc=rc, cid=0)
@@ -428,16 +937,11 @@ class YoutubeCrawler(object):
 
         else:
 
-            results = deque()
+            args = [(rc, cat_id) for cat_id in cat_id_list]
 
-            for cat_id in cat_id_list:
-                ready = pool.apply_async(self._video_trend,
-                                         kwds={'rc': rc, 'cid': cat_id})
-                results.append(ready)
+            results = self._get_pool().starmap(self._video_trend, args)
 
-            outputs = [p.get() for p in results]
-
-            outputs = [elem for elements in outputs for elem in elements]
+            outputs = [elem for elements in results for elem in elements]
 
             for output in outputs:
                 output['vid_cat'] = cat_id_tot_list[output['vid_cat_id']]
@@ -485,34 +989,98 @@ class YoutubeCrawler(object):
         video ids => split into list with 50 vids elements as string => Multiprocessing
         Args:
              vids(str): Youtube video id(s), no length limit
-        Returns:
-            deque: dictionary array
+        Yields:
+            dict: per-video statistics as each 50-id chunk arrives; wrap with
+                  list() for the old materialized behavior
         Examples:
-            >>>video_stats(vid='_S64IMfIod8,_s66WPKCEd8, ...')
-                deque([{'viewCount': '17133', 'likeCount': '83', 'dislikeCount': '0',
-                        'favoriteCount': '0', 'commentCount': '45', 'vid_id': '_S64IMfIod8'},
-                        {'viewCount': '23', 'likeCount': '0', 'dislikeCount': '0',
-                        'favoriteCount': '0', 'commentCount': '0', 'vid_id': '_s66WPKCEd8'}, ...])
+            >>>list(video_stats(vid='_S64IMfIod8,_s66WPKCEd8, ...'))
+                [{'viewCount': '17133', 'likeCount': '83', 'dislikeCount': '0',
+                  'favoriteCount': '0', 'commentCount': '45', 'vid_id': '_S64IMfIod8'},
+                 {'viewCount': '23', 'likeCount': '0', 'dislikeCount': '0',
+                  'favoriteCount': '0', 'commentCount': '0', 'vid_id': '_s66WPKCEd8'}, ...]
         """
         vid_list = vids.split(',')
-        
-        vid_split_list = self._split_list(vid_list, 50)
-        
-        vid_split_list_50 = [','.join(item) for item in vid_split_list]
-        
-        pool = Pool(self.processes)
-        
-        results = [pool.apply_async(self._video_stats, kwds={'vid': id_join_50}) 
-                                            for id_join_50 in vid_split_list_50]
-        
-        outputs = deque()
-        
-        for p in results:
-            
-            outputs.extend(p.get())
-        
-        return outputs
+
+        vid_split_list_50 = [','.join(item) for item in self._chunks(vid_list, 50)]
+
+        for result in self._get_pool().imap_unordered(self._video_stats, vid_split_list_50):
+
+            yield from result
     
+    def _ch_video_stats(self, ch_id, vid):
+        """(ch_id, stats) pair for one 50-id chunk; keeps the channel identity
+        attached through the flat work queue"""
+        return ch_id, self._video_stats(vid)
+
+    def video_stats_by_channel(self, id=None, update=False, days=0,
+                               force_refresh=False):
+        """Video statistics grouped by channel id
+        channel ids => video ids (ids_only) => one flat 50-id work list across
+        all channels => pool => stats grouped back by channel
+        Args:
+             id(str): channel_id(s), comma joined
+             update(bool): True if requesting video data created after N days ago
+             days(int): N days
+             force_refresh(bool): True to bypass the response cache
+        Yields:
+            dict: per-channel statistics as each channel's chunks complete
+        Examples:
+            >>>list(video_stats_by_channel(id=channel_id))
+            [{'ch_id': channel_id,
+              'video_stats': deque([{'viewCount': '17133', 'likeCount': '83',
+                                     'dislikeCount': '0', 'favoriteCount': '0',
+                                     'commentCount': '45',
+                                     'vid_id': '_S64IMfIod8'}, ...])}, ...]
+        """
+        ch_video_list = self.channel_video_desc(id=id, update=update, days=days,
+                                                ids_only=True,
+                                                force_refresh=force_refresh)
+
+        # one flat work list, so the pool stays saturated across channel
+        # boundaries instead of draining each channel's chunks in turn
+        work = [(desc['ch_id'], ','.join(chunk))
+                for desc in ch_video_list
+                for chunk in self._chunks(list(desc['video_ids']), 50)]
+
+        # ordered lazy map keeps each channel's chunks adjacent for groupby
+        stats = self._get_pool().imap(self._ch_video_stats_args, work)
+
+        for ch_id, group in groupby(stats, key=itemgetter(0)):
+
+            video_stats = deque()
+
+            for _, chunk_stats in group:
+                video_stats.extend(chunk_stats)
+
+            yield {'ch_id': ch_id, 'video_stats': video_stats}
+
+    def _ch_video_stats_args(self, args):
+        """single-argument _ch_video_stats adapter for Pool.imap"""
+        return self._ch_video_stats(*args)
+
+    @staticmethod
+    def statistics_sum(vsc):
+        """Sum of video statistics counts
+        Args:
+             vsc(iterable): video statistics dictionaries, e.g. video_stats output
+        Returns:
+            dict: per-key sums over all videos
+        Examples:
+            >>>statistics_sum(video_stats(vids))
+            {'viewCount_sum': 17156, 'likeCount_sum': 83, 'dislikeCount_sum': 0,
+             'favoriteCount_sum': 0, 'commentCount_sum': 45}
+        """
+        total = Counter()
+
+        for vs in vsc:
+
+            for key, value in vs.items():
+
+                if isinstance(value, str) and value.isdigit():
+                    total[key] += int(value)
+
+        return {'%s_sum' % key: value for key, value in total.items()}
+
     def _comment(self, vid, **kwargs):
         """Video comments by video id
         Args:
@@ -651,30 +1219,18 @@ class YoutubeCrawler(object):
         video ids => split into list with 50 vids elements => Multiprocessing
         Args:
              vids(str): Youtube video id(s)
-        Returns:
-            deque: dictionary array
+        Yields:
+            dict: per-comment dictionary as each video's thread completes;
+                  wrap with list() for the old materialized behavior
         Examples:
-            >>>comment(vid='___a64QBUoA,___BxqE6JNY')
-               deque([{'vid_id': '___a64QBUoA'},
-                      {'textDisplay': '1', 'publishedAt': '2017-06-14T06:21:40.000Z', 'authorDisplayName': 'Nabila Kastella', 'authorChannelId': 'UCgXL5lO-MLjGXOjZEQvEtoA',
-                       'likeCount': 1, 'authorProfileImageUrl': 'https://yt3.ggpht.com/-2ETp2uqZBtM/AAAAAAAAAAI/AAAAAAAAAAA/oYtuzdqPRC0/s28-c-k-no-mo-rj-c0xffffff/photo.jpg',
-                       'replyType': False, 'vid_id': '___BxqE6JNY'}])
+            >>>list(comment(vid='___a64QBUoA,___BxqE6JNY'))
+               [{'vid_id': '___a64QBUoA'},
+                {'textDisplay': '1', 'publishedAt': '2017-06-14T06:21:40.000Z', 'authorDisplayName': 'Nabila Kastella', 'authorChannelId': 'UCgXL5lO-MLjGXOjZEQvEtoA',
+                 'likeCount': 1, 'authorProfileImageUrl': 'https://yt3.ggpht.com/-2ETp2uqZBtM/AAAAAAAAAAI/AAAAAAAAAAA/oYtuzdqPRC0/s28-c-k-no-mo-rj-c0xffffff/photo.jpg',
+                 'replyType': False, 'vid_id': '___BxqE6JNY'}]
         """
         vid_list = vids.split(',')
-        
-        vid_split_list = self._split_list(vid_list, self.processes)
-        
-        pool = Pool(self.processes)
-        
-        outputs = deque()
-        
-        for vid_split in vid_split_list:
-            
-            results = [pool.apply_async(self._comment, kwds={'vid': vid}) 
-                       for vid in vid_split]
-            
-            for p in results:
-                
-                outputs.extend(p.get())
-                
-        return outputs
+
+        for result in self._get_pool().imap_unordered(self._comment, vid_list):
+
+            yield from result